@@ -27,7 +27,7 @@ REQUIRED_FILES = [
 REQUIRED_DIRS = [
     "data/output/voiceovers",
     "data/output/thumbnails",
-    "data/backups"
+    "data/runs"
 ]
 
 def validate_environment() -> bool:
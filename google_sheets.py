@@ -1,11 +1,10 @@
 from typing import List
 import os
 import gspread
-import json
 from datetime import datetime
 from oauth2client.service_account import ServiceAccountCredentials
 from dotenv import load_dotenv
-from pathlib import Path
+from output_store import OutputStore
 
 load_dotenv()
 
@@ -15,70 +14,114 @@ def sanitize_data(value):
         return value[:49000]  # Sheets cell limit
     return str(value) if value is not None else ""
 
-def save_to_sheet(rows: List[List]):
-    """Save with backup system and improved error handling"""
+HEADERS = [
+    "Keyword", "Title", "Thumbnail Text",
+    "Description", "Tags", "Script",
+    "Voiceover Path", "Thumbnail Path",
+    "Status", "Timestamp"
+]
+
+def open_sheet():
+    """Authorize and return the output worksheet, creating headers if needed"""
+    # Validate credentials file exists
+    creds_file = os.getenv("GOOGLE_SERVICE_ACCOUNT_FILE")
+    if not creds_file:
+        raise Exception("GOOGLE_SERVICE_ACCOUNT_FILE not set in environment")
+    
+    if not os.path.exists(creds_file):
+        raise Exception(f"Credentials file not found: {creds_file}")
+    
+    # Initialize Google Sheets
+    scope = [
+        "https://spreadsheets.google.com/feeds",
+        "https://www.googleapis.com/auth/drive"
+    ]
+    creds = ServiceAccountCredentials.from_json_keyfile_name(
+        creds_file,
+        scope
+    )
+    client = gspread.authorize(creds)
+    
+    # Open or create sheet
     try:
-        # Validate credentials file exists
-        creds_file = os.getenv("GOOGLE_SERVICE_ACCOUNT_FILE")
-        if not creds_file:
-            raise Exception("GOOGLE_SERVICE_ACCOUNT_FILE not set in environment")
-        
-        if not os.path.exists(creds_file):
-            raise Exception(f"Credentials file not found: {creds_file}")
-        
-        # Initialize Google Sheets
-        scope = [
-            "https://spreadsheets.google.com/feeds",
-            "https://www.googleapis.com/auth/drive"
-        ]
-        creds = ServiceAccountCredentials.from_json_keyfile_name(
-            creds_file,
-            scope
-        )
-        client = gspread.authorize(creds)
-        
-        # Open or create sheet
-        try:
-            sheet = client.open("YouTube Automation Output").sheet1
-        except gspread.exceptions.SpreadsheetNotFound:
-            print("⚠ Sheet not found. Please create 'YouTube Automation Output' in Google Sheets")
-            raise
-        
-        # Initialize headers if needed
-        if not sheet.get_all_values():
-            sheet.append_row([
-                "Keyword", "Title", "Thumbnail Text",
-                "Description", "Tags", "Script",
-                "Voiceover Path", "Thumbnail Path",
-                "Status", "Timestamp"
-            ])
+        sheet = client.open("YouTube Automation Output").sheet1
+    except gspread.exceptions.SpreadsheetNotFound:
+        print("⚠ Sheet not found. Please create 'YouTube Automation Output' in Google Sheets")
+        raise
+    
+    # Initialize headers if needed (only the first row is fetched)
+    if not sheet.row_values(1):
+        sheet.append_row(HEADERS)
+    
+    return sheet
+
+def save_to_sheet(rows: List[List], sheet=None) -> bool:
+    """
+    Batch-upload rows in a single request.
+    Rows that already carry a timestamp column are saved as-is.
+    Returns False on failure; rows stay in the output store for replay.
+    """
+    try:
+        if sheet is None:
+            sheet = open_sheet()
         
-        # Process rows
+        clean_rows = []
         for row in rows:
             clean_row = [sanitize_data(item) for item in row]
-            clean_row.append(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-            sheet.append_row(clean_row)
+            if len(clean_row) < len(HEADERS):
+                clean_row.append(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            clean_rows.append(clean_row)
         
+        sheet.append_rows(clean_rows, value_input_option="RAW")
         print(f"✅ Saved {len(rows)} rows to Google Sheets")
+        return True
     
     except Exception as e:
         print(f"❌ Sheets error: {str(e)}")
-        
-        # Local backup with rotation
+        return False
+
+def replay_unsent(store: OutputStore = None, batch_size: int = 100) -> int:
+    """
+    Upload every row in the output store that has not reached Sheets yet,
+    then delete uploaded segments past the retention window
+    """
+    store = store or OutputStore()
+    unsent = store.unsent_segments()
+    pending = store.pending_count(unsent)
+    uploaded = 0
+    
+    if not pending:
+        print("✅ No unsent rows")
+    else:
+        print(f"📤 Replaying {pending} unsent rows...")
         try:
-            backup_dir = Path("data/backups")
-            backup_dir.mkdir(parents=True, exist_ok=True)
-            
-            # Date-based filename for rotation
-            backup_file = backup_dir / f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            
-            with open(backup_file, "w") as f:
-                json.dump({
-                    "data": rows,
-                    "timestamp": str(datetime.now())
-                }, f, indent=2)
-            
-            print(f"✅ Saved to backup: {backup_file}")
+            sheet = open_sheet()
+        except Exception as e:
+            print(f"❌ Sheets error: {str(e)}")
+            return 0
         
-        except Exception as backup_error:
-            print(f"❌ Backup failed: {str(backup_error)}")
\ No newline at end of file
+        for segment, end, records in store.iter_unsent(batch_size, unsent):
+            rows = [record["row"] + [record["timestamp"]] for record in records]
+            if not save_to_sheet(rows, sheet):
+                print(f"⚠ Replay stopped at {segment.name}; {pending - uploaded} rows still pending")
+                break
+            store.mark_sent(segment, end)
+            uploaded += len(rows)
+    
+    removed = store.prune()
+    if removed:
+        print(f"🧹 Removed {removed} uploaded run segments past retention")
+    
+    return uploaded
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Google Sheets output tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    replay = subparsers.add_parser("replay", help="Batch-upload unsent rows from the output store")
+    replay.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+    
+    if args.command == "replay":
+        replay_unsent(batch_size=args.batch_size)
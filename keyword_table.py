@@ -0,0 +1,110 @@
+"""
+Interned keyword table for large scrapes.
+
+Every keyword string is stored once and referred to by a sequential integer
+ID everywhere else (frontier queues, result sets). Per-keyword attributes live
+in parallel array columns instead of per-keyword tuples/dicts:
+
+    depth[id]       BFS depth at which the keyword was first discovered
+    parent[id]      ID of the query whose suggestions produced it (-1 for prompts)
+    prompt[id]      ID of the search prompt it descends from
+    fetched_at[id]  unix time its own suggestions were last fetched (0 = never)
+
+On disk the keywords are an append-only text file (one per line) and the
+columns are raw array dumps, so loading and saving never build a Python
+object per keyword per column.
+"""
+from array import array
+from itertools import islice
+from pathlib import Path
+from typing import BinaryIO, Dict, List
+
+COLUMNS = ("depth", "parent", "prompt", "fetched_at")
+
+class KeywordTable:
+    """Append-only string <-> ID table with array-backed attribute columns"""
+
+    __slots__ = ("_ids", "text", "depth", "parent", "prompt", "fetched_at", "_saved")
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self.text: List[str] = []
+        self.depth = array("b")
+        self.parent = array("l")
+        self.prompt = array("l")
+        self.fetched_at = array("d")
+        self._saved = (0, 0)  # keywords already in the text file, its byte size
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def __contains__(self, text: str) -> bool:
+        return text in self._ids
+
+    def intern(self, text: str, depth: int = 0, parent: int = -1, prompt: int = -1) -> int:
+        """
+        Return the ID of text, adding it with the given attributes if unseen.
+        Existing keywords are returned unchanged (see move); new IDs are
+        always len(table) at call time. prompt=-1 makes it its own prompt.
+        """
+        kid = self._ids.get(text)
+        if kid is not None:
+            return kid
+        kid = len(self.text)
+        self._ids[text] = kid
+        self.text.append(text)
+        self.depth.append(depth)
+        self.parent.append(parent)
+        self.prompt.append(kid if prompt < 0 else prompt)
+        self.fetched_at.append(0.0)
+        return kid
+
+    def move(self, kid: int, depth: int, parent: int = -1, prompt: int = -1):
+        """
+        Re-home a keyword found at a shallower depth (or promoted to a
+        prompt) and mark it unfetched so it is expanded from its new place
+        """
+        self.depth[kid] = depth
+        self.parent[kid] = parent
+        self.prompt[kid] = kid if prompt < 0 else prompt
+        self.fetched_at[kid] = 0.0
+
+    def get(self, text: str) -> int:
+        """ID of text, or -1 if it has never been seen"""
+        return self._ids.get(text, -1)
+
+    def write_text(self, path: Path) -> None:
+        """
+        Append keywords added since the last read/write to a text file, one
+        per line. Lines past the saved count (from an interrupted save) are
+        truncated first, so existing keywords are never rewritten.
+        """
+        count, offset = self._saved
+        with open(path, "r+b" if path.exists() else "wb") as f:
+            f.seek(offset)
+            f.truncate()
+            for text in islice(self.text, count, None):
+                f.write(text.replace("\n", " ").encode("utf-8") + b"\n")
+            self._saved = (len(self.text), f.tell())
+
+    def write_columns(self, f: BinaryIO) -> None:
+        """Dump the attribute columns as raw machine values"""
+        for name in COLUMNS:
+            getattr(self, name).tofile(f)
+
+    @classmethod
+    def read(cls, text_path: Path, count: int, columns: BinaryIO) -> "KeywordTable":
+        """Load count keywords and their columns written by write_text/write_columns"""
+        table = cls()
+        with open(text_path, "rb") as f:
+            for _ in range(count):
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    raise ValueError("keyword file has fewer keywords than expected")
+                table.text.append(line[:-1].decode("utf-8"))
+            table._saved = (count, f.tell())
+        table._ids = {text: kid for kid, text in enumerate(table.text)}
+        for name in COLUMNS:
+            # Raises EOFError if the column file is short
+            getattr(table, name).fromfile(columns, count)
+        return table
@@ -1,4 +1,4 @@
-from typing import List, Dict
+from typing import List, Dict, Tuple
 import schedule
 import time
 import os
@@ -8,7 +8,8 @@ from analyzer import filter_keywords
 from content.script_gen import generate_video_metadata
 from content.voiceover import generate_voiceovers
 from content.thumbnail import generate_thumbnails
-from google_sheets import save_to_sheet
+from google_sheets import replay_unsent
+from output_store import OutputStore
 from startup_validator import validate_environment
 
 load_dotenv()
@@ -56,13 +57,33 @@ def process_keyword(keyword: Dict) -> List:
         traceback.print_exc()
         return None
 
+def upload_results(store: OutputStore) -> Tuple[int, int]:
+    """Upload unsent rows from this and earlier runs; returns (uploaded, still pending)"""
+    try:
+        print("\n💾 Uploading unsent results to Google Sheets...")
+        uploaded = replay_unsent(store)
+        remaining = store.pending_count()
+        if remaining:
+            print(f"⚠ {remaining} rows still pending; retried next run or via 'python google_sheets.py replay'")
+        return uploaded, remaining
+    
+    except Exception as e:
+        print(f"❌ Upload failed: {str(e)}")
+        return 0, -1
+
 def daily_job():
     """Main automation job"""
     print("\n" + "="*60)
     print("🚀 Starting automation job...")
     print("="*60)
     
+    store = None
+    success_count = 0
+    fail_count = 0
+    
     try:
+        store = OutputStore()
+        
         # Get and process keywords
         print("📊 Scraping keywords...")
         raw_keywords = run_scraper(limit=KEYWORD_LIMIT)
@@ -76,39 +97,38 @@ def daily_job():
             print("⚠ No keywords to process")
             return
         
-        # Process all keywords
-        results = []
-        success_count = 0
-        fail_count = 0
-        
-        for i, keyword in enumerate(filtered_keywords, 1):
-            print(f"\n[{i}/{len(filtered_keywords)}] Processing keyword...")
-            
-            try:
-                row = process_keyword(keyword)
-                if row:
-                    results.append(row)
-                    success_count += 1
-                else:
+        # Process all keywords, persisting each row as soon as it is done
+        with store.open_run() as run:
+            print(f"📝 Writing results to {run.path}")
+            for i, keyword in enumerate(filtered_keywords, 1):
+                print(f"\n[{i}/{len(filtered_keywords)}] Processing keyword...")
+                
+                try:
+                    row = process_keyword(keyword)
+                    if row:
+                        run.append(row)
+                        success_count += 1
+                    else:
+                        fail_count += 1
+                except Exception as e:
+                    print(f"❌ Unexpected error processing keyword: {str(e)}")
                     fail_count += 1
-            except Exception as e:
-                print(f"❌ Unexpected error processing keyword: {str(e)}")
-                fail_count += 1
-        
-        # Save results
-        if results:
-            print(f"\n💾 Saving {len(results)} results to Google Sheets...")
-            save_to_sheet(results)
-            print(f"✅ Job finished. Success: {success_count}, Failed: {fail_count}")
-        else:
-            print("⚠ No results to save")
     
     except Exception as e:
         print(f"🔥 Critical job failure: {str(e)}")
         import traceback
         traceback.print_exc()
     
-    print("="*60 + "\n")
+    finally:
+        # Upload this run plus anything left over from earlier runs, even
+        # when there was nothing new to process
+        if store is not None:
+            uploaded, remaining = upload_results(store)
+            status = "✅" if remaining == 0 else "⚠"
+            pending = "unknown" if remaining < 0 else remaining
+            print(f"{status} Job finished. Success: {success_count}, Failed: {fail_count}, "
+                  f"Uploaded: {uploaded}, Pending: {pending}")
+        print("="*60 + "\n")
 
 if __name__ == "__main__":
     # Validate environment before starting
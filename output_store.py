@@ -0,0 +1,218 @@
+"""
+Append-only output store for finished pipeline rows.
+
+Every run writes its rows to one segment file as soon as each keyword is
+done, so nothing has to be held in memory until the end of the job. Each
+record is one JSON line, optionally compressed as its own gzip member or
+zstd frame (concatenated members are still a valid .gz/.zst file). A fixed
+width offset index next to every segment gives O(1) access to record N, and
+a small ".sent" watermark records how many leading rows reached Google
+Sheets, so recovery only has to read the unsent tail.
+
+Layout for one run:
+    data/runs/run_20240101_060000.jsonl[.gz|.zst]   # records
+    data/runs/run_20240101_060000.idx               # <offset, length> per record
+    data/runs/run_20240101_060000.sent              # rows already uploaded
+"""
+import gzip
+import json
+import os
+import struct
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from dotenv import load_dotenv
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+load_dotenv()
+
+OUTPUT_DIR = os.getenv("OUTPUT_DIR", "data/runs")
+OUTPUT_COMPRESSION = os.getenv("OUTPUT_COMPRESSION", "gzip")
+# Fully uploaded segments older than this are deleted (negative keeps them)
+OUTPUT_RETENTION_DAYS = float(os.getenv("OUTPUT_RETENTION_DAYS", "7"))
+
+# One index entry per record: byte offset (uint64) and byte length (uint32)
+INDEX_ENTRY = struct.Struct("<QI")
+
+SUFFIXES = {
+    "none": ".jsonl",
+    "gzip": ".jsonl.gz",
+    "zstd": ".jsonl.zst",
+}
+
+def _resolve_compression(compression: Optional[str]) -> str:
+    """Normalize the requested codec, falling back when zstd is unavailable"""
+    compression = (compression or "none").lower()
+    if compression not in SUFFIXES:
+        print(f"⚠ Unknown OUTPUT_COMPRESSION '{compression}', using none")
+        return "none"
+    if compression == "zstd" and zstandard is None:
+        print("⚠ zstandard not installed, falling back to gzip")
+        return "gzip"
+    return compression
+
+def _compression_for(path: Path) -> str:
+    """Detect the codec of an existing segment from its file name"""
+    if path.name.endswith(".gz"):
+        return "gzip"
+    if path.name.endswith(".zst"):
+        return "zstd"
+    return "none"
+
+def _encode(record: Dict, compression: str) -> bytes:
+    data = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+    if compression == "gzip":
+        return gzip.compress(data)
+    if compression == "zstd":
+        return zstandard.ZstdCompressor().compress(data)
+    return data
+
+def _decode(blob: bytes, compression: str) -> Dict:
+    if compression == "gzip":
+        blob = gzip.decompress(blob)
+    elif compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read .zst segments")
+        blob = zstandard.ZstdDecompressor().decompress(blob)
+    return json.loads(blob.decode("utf-8"))
+
+def _segment_stem(path: Path) -> Path:
+    """run_x.jsonl.gz -> run_x (sidecar files share this stem)"""
+    return path.with_name(path.name.split(".", 1)[0])
+
+class SegmentWriter:
+    """Streams rows of a single run into one segment plus its index"""
+
+    def __init__(self, path: Path, compression: str):
+        self.path = path
+        self.compression = compression
+        self.count = 0
+        self._data = open(path, "ab")
+        self._index = open(_segment_stem(path).with_suffix(".idx"), "ab")
+        self._offset = self._data.tell()
+
+    def append(self, row: List) -> None:
+        """Write one finished row; it is on disk once this returns"""
+        blob = _encode({
+            "row": row,
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }, self.compression)
+        self._data.write(blob)
+        self._data.flush()
+        # Index goes second so it never points past the end of the data
+        self._index.write(INDEX_ENTRY.pack(self._offset, len(blob)))
+        self._index.flush()
+        self._offset += len(blob)
+        self.count += 1
+
+    def close(self) -> None:
+        self._data.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class OutputStore:
+    """Directory of run segments with per-segment upload watermarks"""
+
+    def __init__(self, root: str = OUTPUT_DIR, compression: Optional[str] = OUTPUT_COMPRESSION):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.compression = _resolve_compression(compression)
+
+    def open_run(self) -> SegmentWriter:
+        """Start a new segment for the current run"""
+        name = f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}{SUFFIXES[self.compression]}"
+        return SegmentWriter(self.root / name, self.compression)
+
+    def segments(self) -> List[Path]:
+        """All segments, oldest first"""
+        return sorted(
+            p for p in self.root.glob("run_*.jsonl*")
+            if _segment_stem(p).with_suffix(".idx").exists()
+        )
+
+    def record_count(self, segment: Path) -> int:
+        index_file = _segment_stem(segment).with_suffix(".idx")
+        return index_file.stat().st_size // INDEX_ENTRY.size
+
+    def sent_count(self, segment: Path) -> int:
+        sent_file = _segment_stem(segment).with_suffix(".sent")
+        try:
+            return int(sent_file.read_text().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def mark_sent(self, segment: Path, count: int) -> None:
+        """Atomically advance the upload watermark of a segment"""
+        sent_file = _segment_stem(segment).with_suffix(".sent")
+        tmp_file = sent_file.with_suffix(".sent.tmp")
+        tmp_file.write_text(str(count))
+        os.replace(tmp_file, sent_file)
+
+    def read(self, segment: Path, start: int = 0, stop: Optional[int] = None) -> Iterator[Dict]:
+        """Yield records [start, stop) of a segment using the offset index"""
+        total = self.record_count(segment)
+        stop = total if stop is None else min(stop, total)
+        if start >= stop:
+            return
+        compression = _compression_for(segment)
+        index_file = _segment_stem(segment).with_suffix(".idx")
+        with open(index_file, "rb") as idx, open(segment, "rb") as data:
+            idx.seek(start * INDEX_ENTRY.size)
+            for _ in range(start, stop):
+                offset, length = INDEX_ENTRY.unpack(idx.read(INDEX_ENTRY.size))
+                data.seek(offset)
+                yield _decode(data.read(length), compression)
+
+    def unsent_segments(self) -> List[Tuple[Path, int, int]]:
+        """(segment, sent, total) for every segment with rows not yet uploaded"""
+        unsent = []
+        for segment in self.segments():
+            total = self.record_count(segment)
+            sent = self.sent_count(segment)
+            if sent < total:
+                unsent.append((segment, sent, total))
+        return unsent
+
+    def iter_unsent(self, batch_size: int = 100,
+                    unsent: Optional[List[Tuple[Path, int, int]]] = None) -> Iterator[Tuple[Path, int, List[Dict]]]:
+        """
+        Yield (segment, end, records) batches of rows not yet uploaded.
+        Call mark_sent(segment, end) after a batch is saved successfully.
+        """
+        for segment, start, total in (self.unsent_segments() if unsent is None else unsent):
+            while start < total:
+                end = min(start + batch_size, total)
+                yield segment, end, list(self.read(segment, start, end))
+                start = end
+
+    def pending_count(self, unsent: Optional[List[Tuple[Path, int, int]]] = None) -> int:
+        if unsent is None:
+            unsent = self.unsent_segments()
+        return sum(total - sent for _, sent, total in unsent)
+
+    def prune(self, max_age_days: float = OUTPUT_RETENTION_DAYS) -> int:
+        """Delete fully uploaded segments last written more than max_age_days ago"""
+        if max_age_days < 0:
+            return 0
+        cutoff = time.time() - max_age_days * 86400
+        removed = 0
+        for segment in self.segments():
+            if segment.stat().st_mtime >= cutoff:
+                continue
+            if self.sent_count(segment) < self.record_count(segment):
+                continue
+            stem = _segment_stem(segment)
+            for path in (segment, stem.with_suffix(".idx"), stem.with_suffix(".sent")):
+                path.unlink(missing_ok=True)
+            removed += 1
+        return removed
@@ -1,6 +1,24 @@
 import json
+import os
+import time
 import requests
-from typing import List, Set
+from array import array
+from collections import deque
+from itertools import zip_longest
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from keyword_table import KeywordTable
+
+load_dotenv()
+
+# Crawl frontier configuration
+FRONTIER_FILE = os.getenv("FRONTIER_FILE", "data/frontier.json")
+FRONTIER_STALE_HOURS = float(os.getenv("FRONTIER_STALE_HOURS", "168"))
+SCRAPER_REQUEST_BUDGET = int(os.getenv("SCRAPER_REQUEST_BUDGET", "200"))
+FRONTIER_SLICE = 5  # requests per prompt before rotating to the next one
+MAX_FAILED_REQUESTS = 3  # consecutive failed requests before giving up on a run
+PENDING_FACTOR = 4  # keywords kept for later runs, in multiples of limit
 
 def get_trending_topics() -> List[str]:
     """Read trending topics from topics.json"""
@@ -28,8 +46,8 @@ def get_search_prefixes() -> List[str]:
         print(f"❌ Invalid JSON in topics.json: {str(e)}")
         return []
 
-def get_suggestions(query: str) -> List[str]:
-    """Get search suggestions from Google's API"""
+def get_suggestions(query: str) -> Optional[List[str]]:
+    """Get search suggestions from Google's API, or None if the request failed"""
     try:
         url = "https://suggestqueries.google.com/complete/search"
         params = {"client": "firefox", "ds": "yt", "q": query}
@@ -39,49 +57,226 @@ def get_suggestions(query: str) -> List[str]:
             return response.json()[1]
         else:
             print(f"⚠ Google suggestions API returned {response.status_code} for '{query}'")
-            return []
+            return None
     
     except requests.Timeout:
         print(f"⚠ Timeout fetching suggestions for '{query}'")
-        return []
+        return None
     except Exception as e:
         print(f"⚠ Error fetching suggestions for '{query}': {str(e)}")
-        return []
+        return None
+
+def frontier_paths() -> Tuple[Path, Path, Path]:
+    """
+    The frontier is stored as three files:
+    - FRONTIER_FILE: small JSON with the cursor, queues and pending IDs
+    - .keywords: append-only keyword text, one per line, in ID order
+    - .columns: raw table columns followed by every prompt's member IDs
+    """
+    path = Path(FRONTIER_FILE)
+    return path, path.with_suffix(".keywords"), path.with_suffix(".columns")
+
+def load_frontier() -> Dict:
+    """
+    Load the persistent crawl frontier, starting fresh if missing or corrupt:
+    - cursor: index of the next prompt to explore
+    - table: KeywordTable of every keyword seen, with depth, origin and fetch times
+    - prompts: prompt -> per-prompt state (see new_prompt_state)
+    - pending: IDs found by earlier runs but not returned yet
+    """
+    fresh = {"cursor": 0, "table": KeywordTable(), "prompts": {}, "pending": []}
+    state_file, keywords_file, columns_file = frontier_paths()
+    try:
+        with open(state_file, "r") as f:
+            data = json.load(f)
+        
+        with open(columns_file, "rb") as f:
+            table = KeywordTable.read(keywords_file, data["keywords"], f)
+            members = array("l")
+            members.fromfile(f, sum(st["members"] for st in data["prompts"].values()))
+            if f.read(1):
+                raise ValueError("columns file is longer than expected")
+        
+        prompts = {}
+        offset = 0
+        for p, st in data["prompts"].items():
+            prompts[p] = {
+                "queue": deque(st["queue"]),
+                "members": members[offset:offset + st["members"]],
+            }
+            offset += st["members"]
+        
+        return {
+            "cursor": data.get("cursor", 0),
+            "table": table,
+            "prompts": prompts,
+            "pending": data.get("pending", []),
+        }
+    except FileNotFoundError:
+        return fresh
+    except (json.JSONDecodeError, KeyError, ValueError, EOFError) as e:
+        print(f"⚠ Invalid frontier in {state_file}, starting fresh: {str(e)}")
+        return fresh
 
-def explore_keywords(base: str, depth: int = 2, seen: Set[str] = None, max_iterations: int = 1000) -> List[str]:
-    """Recursively explore keyword suggestions with safety limits"""
-    if seen is None:
-        seen = set()
+def save_frontier(state: Dict):
+    """
+    Write the crawl frontier: new keywords are appended, then the columns
+    and the JSON state are each replaced atomically
+    """
+    state_file, keywords_file, columns_file = frontier_paths()
+    state_file.parent.mkdir(parents=True, exist_ok=True)
+    table = state["table"]
+    table.write_text(keywords_file)
+    
+    tmp_columns = columns_file.with_name(columns_file.name + ".tmp")
+    with open(tmp_columns, "wb") as f:
+        table.write_columns(f)
+        for st in state["prompts"].values():
+            st["members"].tofile(f)
+    os.replace(tmp_columns, columns_file)
+    
+    data = {
+        "cursor": state["cursor"],
+        "keywords": len(table),
+        "prompts": {
+            p: {"queue": list(st["queue"]), "members": len(st["members"])}
+            for p, st in state["prompts"].items()
+        },
+        "pending": list(state["pending"]),
+    }
+    tmp_state = state_file.with_name(state_file.name + ".tmp")
+    with open(tmp_state, "w") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp_state, state_file)
+
+def requeue_stale(table: KeywordTable, root: int, state: Dict) -> int:
+    """
+    Queue a prompt's fetched nodes whose suggestions have gone stale.
+    Only the prompt's own member list is scanned; entries for keywords
+    that moved to another prompt are dropped from it on the way.
+    """
+    cutoff = time.time() - FRONTIER_STALE_HOURS * 3600
+    prompt, fetched_at = table.prompt, table.fetched_at
+    members = sorted({kid for kid in state["members"] if prompt[kid] == root})
+    state["members"] = array("l", members)
+    
+    stale = [kid for kid in members if 0 < fetched_at[kid] < cutoff]
+    stale.sort(key=table.depth.__getitem__)
+    state["queue"].extend(stale)
+    return len(stale)
+
+def prompt_root(table: KeywordTable, prompt: str) -> int:
+    """
+    ID of a search prompt as a depth-0 root of its own, even if it was
+    already seen as a suggestion under another prompt
+    """
+    root = table.intern(prompt)
+    if table.depth[root] != 0 or table.prompt[root] != root:
+        table.move(root, 0)
+    return root
+
+def new_prompt_state(table: KeywordTable, prompt: str) -> Dict:
+    """
+    Fresh per-prompt frontier:
+    - queue: deque of keyword IDs still to fetch, in BFS order
+    - members: IDs of the keywords this prompt owns, for stale checks
+    """
+    root = prompt_root(table, prompt)
+    queue = deque() if table.fetched_at[root] else deque([root])
+    return {"queue": queue, "members": array("l", [root])}
+
+def explore_keywords(base: str, table: KeywordTable = None, state: Dict = None,
+                     depth: int = 2, max_requests: int = 1000) -> Tuple[List[int], int, bool]:
+    """
+    Continue BFS keyword exploration of one prompt from its saved frontier.
+    Stops after max_requests suggestion requests, leaving the rest of the
+    queue for the next call. Visited nodes are only fetched again once they
+    have gone stale. A failed request ends the call early.
+    Returns (IDs of keywords that are new to the table or were moved here
+    from a deeper position, requests made, whether a request failed);
+    keywords that were already known are not returned again.
+    """
+    if table is None:
+        table = KeywordTable()
+    if state is None:
+        state = new_prompt_state(table, base)
+    root = prompt_root(table, base)
+    queue = state["queue"]
+    members = state["members"]
+    
+    # Frontier exhausted: only re-expand what has gone stale
+    if not queue:
+        requeue_stale(table, root, state)
+        members = state["members"]
     
-    queue = [(base, 0)]
     results = []
-    iterations = 0
+    requests_made = 0
+    failed = False
+    cutoff = time.time() - FRONTIER_STALE_HOURS * 3600
     
-    while queue and iterations < max_iterations:
-        iterations += 1
-        query, d = queue.pop(0)
+    while queue and requests_made < max_requests:
+        kid = queue.popleft()
+        d = table.depth[kid]
         
-        # Skip if already seen or depth exceeded
-        if query in seen or d > depth:
+        # Skip nodes past the depth limit (e.g. after lowering it), nodes
+        # moved to another prompt and duplicates fetched since being queued
+        if d > depth or table.prompt[kid] != root or table.fetched_at[kid] >= cutoff:
             continue
         
-        seen.add(query)
-        suggestions = get_suggestions(query)
-        results.extend(suggestions)
+        requests_made += 1
+        suggestions = get_suggestions(table.text[kid])
         
-        # Only explore deeper if within depth limit
-        if d < depth:
-            for s in suggestions:
-                if s not in seen:
-                    queue.append((s, d + 1))
+        # Failed request: keep the node unfetched and retry it next time
+        if suggestions is None:
+            queue.appendleft(kid)
+            failed = True
+            break
+        table.fetched_at[kid] = time.time()
+        
+        for s in suggestions:
+            new_id = len(table)
+            sid = table.intern(s, d + 1, kid, root)
+            
+            # Only explore deeper if within depth limit. Known keywords are
+            # already queued or fetched, unless this path reaches them at a
+            # shallower depth (possibly under another prompt)
+            if sid == new_id:
+                results.append(sid)
+                members.append(sid)
+                if d < depth:
+                    queue.append(sid)
+            elif d < depth and table.depth[sid] > d + 1:
+                table.move(sid, d + 1, kid, root)
+                results.append(sid)
+                members.append(sid)
+                queue.append(sid)
     
-    if iterations >= max_iterations:
-        print(f"⚠ Hit iteration limit ({max_iterations}) for '{base}'")
+    return results, requests_made, failed
+
+def interleave_by_prompt(table: KeywordTable, keyword_ids, roots: List[int]) -> List[int]:
+    """
+    Order keyword IDs round-robin across their source prompts (in roots
+    order, then any others), newest first within each prompt
+    """
+    groups = {}
+    for kid in keyword_ids:
+        groups.setdefault(table.prompt[kid], []).append(kid)
+    ordered = [groups.pop(root) for root in roots if root in groups]
+    ordered.extend(groups.values())
     
-    return list(set(results))
+    result = []
+    for batch in zip_longest(*(reversed(group) for group in ordered)):
+        result.extend(kid for kid in batch if kid is not None)
+    return result
 
 def run_scraper(limit: int = 50) -> List[str]:
-    """Main function to run the scraping process"""
+    """
+    Main function to run the scraping process.
+    Rotates across prompts in small slices, resuming each prompt's frontier
+    from the previous run, until the request budget is spent. Returns at most
+    limit keywords, picked round-robin across prompts; up to PENDING_FACTOR
+    times that many are kept for later runs and the oldest extras are dropped.
+    """
     topics = get_trending_topics()
     prefixes = get_search_prefixes()
     
@@ -97,17 +292,61 @@ def run_scraper(limit: int = 50) -> List[str]:
     
     print(f"📋 Generated {len(prompts)} search prompts")
     
-    # Fetch suggestions for each prompt
-    all_keywords = set()
-    for i, prompt in enumerate(prompts, 1):
-        print(f"  [{i}/{len(prompts)}] Exploring: {prompt}")
-        keywords = explore_keywords(prompt)
-        all_keywords.update(keywords)
+    frontier = load_frontier()
+    table = frontier["table"]
+    prompt_states = frontier["prompts"]
+    cursor = frontier["cursor"] % len(prompts)
+    roots = [prompt_root(table, p) for p in prompts[cursor:] + prompts[:cursor]]
+    budget = SCRAPER_REQUEST_BUDGET
+    idle = 0  # consecutive prompts with nothing left to fetch
+    failures = 0  # consecutive prompts whose slice ended in a failed request
+    
+    # Fetch suggestions round-robin, starting where the last run stopped.
+    # Keyword IDs go into a dict used as an insertion-ordered set, after the
+    # backlog from earlier runs.
+    found = dict.fromkeys(frontier["pending"])
+    crawled = False
+    try:
+        while budget > 0 and idle < len(prompts):
+            prompt = prompts[cursor]
+            cursor = (cursor + 1) % len(prompts)
+            
+            if prompt not in prompt_states:
+                prompt_states[prompt] = new_prompt_state(table, prompt)
+            state = prompt_states[prompt]
+            keyword_ids, requests_made, failed = explore_keywords(
+                prompt, table, state, max_requests=min(FRONTIER_SLICE, budget)
+            )
+            budget -= requests_made
+            idle = 0 if requests_made else idle + 1
+            
+            if requests_made:
+                print(f"  Explored: {prompt} ({requests_made} requests, {len(state['queue'])} queued)")
+            found.update(dict.fromkeys(keyword_ids))
+            
+            # Back off instead of hammering a rate-limited or unavailable API
+            failures = failures + 1 if failed else 0
+            if failures >= MAX_FAILED_REQUESTS:
+                print(f"⚠ {failures} suggestion requests failed in a row, stopping this run")
+                # Resume at the first prompt that failed next time
+                cursor = (cursor - failures) % len(prompts)
+                break
         
-        if len(all_keywords) >= limit:
-            print(f"✅ Reached keyword limit ({limit})")
-            break
+        crawled = True
+    finally:
+        # Bounded backlog; if the crawl failed nothing is returned this time
+        ordered = interleave_by_prompt(table, found, roots)
+        kept = ordered[:limit * (PENDING_FACTOR + 1)]
+        result_ids = kept[:limit] if crawled else []
+        frontier["pending"] = kept[len(result_ids):]
+        frontier["cursor"] = cursor
+        save_frontier(frontier)
+    
+    if len(ordered) > len(kept):
+        print(f"⚠ Dropped {len(ordered) - len(kept)} older keywords over the backlog limit")
     
-    result = list(all_keywords)[:limit]
-    print(f"✅ Scraped {len(result)} unique keywords")
-    return result
\ No newline at end of file
+    print(f"📡 Used {SCRAPER_REQUEST_BUDGET - budget}/{SCRAPER_REQUEST_BUDGET} requests, "
+          f"{len(table)} keywords known")
+    result = [table.text[kid] for kid in result_ids]
+    print(f"✅ Scraped {len(result)} unique keywords ({len(frontier['pending'])} kept for later runs)")
+    return result